@@ -15,4 +15,4 @@ class Content(models.Model):
         ('deleted', 'Deleted'),
     ], string='State', default='enabled', required=True)
 
-    device = fields.Many2one('assignment_ftp_interface.device', string='Device', required=True)
\ No newline at end of file
+    device = fields.Many2one('assignment_ftp_interface.device', string='Device', required=True, index=True)
\ No newline at end of file
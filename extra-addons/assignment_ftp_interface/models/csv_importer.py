@@ -1,4 +1,8 @@
 from odoo import models, api
+from odoo.tools import split_every
+from psycopg2.extras import execute_values
+import hashlib
+import io
 import os
 from datetime import datetime
 from ..utils import csv_cleaner
@@ -6,6 +10,48 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+# Number of cleaned rows imported together, i.e. per INSERT, UPDATE or COPY statement.
+BATCH_SIZE = 1000
+
+# Read buffer of the CSV files (4 MiB), so large files are read with few read() system calls.
+READ_BUFFER_SIZE = 1 << 22
+
+# Temporary table the content rows are staged in while they are imported.
+CONTENT_IMPORT_TABLE = 'assignment_ftp_interface_content_import'
+
+# System parameters holding the digest of the last imported version of each CSV file.
+DEVICES_HASH_PARAM = 'assignment_ftp_interface.devices_csv_last_hash'
+CONTENT_HASH_PARAM = 'assignment_ftp_interface.content_csv_last_hash'
+
+# System parameters holding the earliest expire date that had not passed yet during the last
+# import of each CSV file. Importing the file again gives the same result until that moment.
+DEVICES_EXPIRY_PARAM = 'assignment_ftp_interface.devices_csv_next_expiry'
+CONTENT_EXPIRY_PARAM = 'assignment_ftp_interface.content_csv_next_expiry'
+
+# Next expiry stored when no imported row can expire any more.
+NO_EXPIRY = '9999-12-31 23:59:59'
+
+# Characters that must be escaped in the text format of COPY, which separates columns with
+# tabs and rows with newlines.
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def _copy_value(value):
+    """Formats a value as a column of a COPY ... FROM STDIN text row."""
+    if value is None or value is False:
+        return '\\N'
+    return str(value).translate(_COPY_ESCAPES)
+
+def _file_digest(path, delimiter):
+    """
+    Hashes a CSV file in 1 MiB chunks, together with the delimiter it is cleaned with,
+    so that an unchanged file can be recognized without cleaning it.
+    """
+    digest = hashlib.blake2b(delimiter.encode(), digest_size=16)
+    with open(path, 'rb', buffering=0) as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class CsvImporter(models.Model):
     _name = 'assignment_ftp_interface.csv_importer'
     _description = 'CSV Import Model'
@@ -22,6 +68,75 @@ class CsvImporter(models.Model):
         delimiter = get_param('assignment_ftp_interface.csv_delimiter', default=',')
         return path, delimiter
 
+    @api.model
+    def _bulk_upsert(self, model, vals_list, conflict_fname):
+        """
+        Inserts many records of a model with a single INSERT ... ON CONFLICT DO UPDATE statement
+        per batch. Rows whose conflict_fname value already exists update that record instead,
+        so no lookup of existing records is needed; records already holding the row's values
+        are left untouched.
+
+        Args:
+            model: The (empty) recordset of the model to write to.
+            vals_list: A list of vals dicts with the same keys, which must be stored fields.
+            conflict_fname: A field of vals_list backed by a UNIQUE constraint.
+
+        Returns:
+            A tuple with the number of records created and updated; the others were unchanged.
+        """
+        fnames = list(vals_list[0])
+        # execute_values only takes per-row parameters, so the user is passed along with each row.
+        uid = self.env.uid
+        rows = [(*(vals[fname] for fname in fnames), uid, uid) for vals in vals_list]
+
+        # Write pending ORM changes first, so they cannot overwrite ours when flushed later.
+        model.flush_model()
+
+        columns = ', '.join(f'"{fname}"' for fname in fnames)
+        update_fnames = [fname for fname in fnames if fname != conflict_fname]
+        assignments = ', '.join(f'"{fname}" = EXCLUDED."{fname}"' for fname in update_fnames)
+        current = ', '.join(f't."{fname}"' for fname in update_fnames)
+        excluded = ', '.join(f'EXCLUDED."{fname}"' for fname in update_fnames)
+        # VALUES columns are untyped, so cast each one to the type of its target column.
+        template = '(' + ', '.join(f'%s::{model._fields[fname].column_type[0]}' for fname in fnames)
+        template += ", %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC'))"
+        # Unchanged records are filtered out by the WHERE clause and not returned at all; of the
+        # returned ones, xmax is only 0 for freshly inserted rows, which tells creates and updates apart.
+        query = f"""
+            INSERT INTO "{model._table}" AS t ({columns}, create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT ("{conflict_fname}") DO UPDATE
+               SET {assignments}, write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+             WHERE ({current}) IS DISTINCT FROM ({excluded})
+            RETURNING (xmax = 0)
+        """
+        written = execute_values(self.env.cr, query, rows, template=template, page_size=BATCH_SIZE, fetch=True)
+
+        # The records were changed behind the ORM's back, so drop their cached values.
+        model.invalidate_model()
+        created = sum(1 for is_insert, in written if is_insert)
+        return created, len(written) - created
+
+    @api.model
+    def _copy_rows(self, table, columns, rows):
+        """
+        Streams rows into a table with a single COPY ... FROM STDIN, which is cheaper than
+        INSERT statements for large batches.
+
+        Args:
+            table: The name of the table to copy into.
+            columns: The names of the columns the values of each row are for.
+            rows: An iterable of tuples with one value per column.
+        """
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join([_copy_value(value) for value in row]))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        self.env.cr.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN', buffer)
+
     @api.model
     def import_csv_data(self):
         _logger.info("Starting CSV import cron job.")
@@ -32,111 +147,216 @@ class CsvImporter(models.Model):
             _logger.error("The CSV import path is not configured. Please set it in the settings.")
             return False
 
-        self._import_devices(csv_path, delimiter)
-        self._import_content(csv_path, delimiter)
+        devices_changed = self._import_devices(csv_path, delimiter)
+        self._import_content(csv_path, delimiter, devices_changed)
 
         _logger.info("Finished CSV import cron job.")
         return True
 
     @api.model
-    def _import_devices(self, path, delimiter):
-        device_file_path = os.path.join(path, 'devices.csv')
-        _logger.info(f"Starting import of devices from: {device_file_path}")
+    def _import_file(self, path, file_name, delimiter, hash_param, expiry_param, clean_data, import_batch,
+                     entity, records_label, force=False):
+        """
+        Cleans a CSV file and imports it in batches, unless importing it again would give the
+        same result: the file did not change since its last import, and none of its rows
+        expired since then.
+
+        Args:
+            path: The directory holding the CSV file.
+            file_name: The name of the CSV file.
+            delimiter: The delimiter of the CSV file.
+            hash_param: The system parameter holding the digest of the last imported file.
+            expiry_param: The system parameter holding the next expiry of the last imported file.
+            clean_data: The csv_cleaner function cleaning the file.
+            import_batch: The method importing a batch of cleaned rows, returning the number of
+                records created, updated and left unchanged.
+            entity: The name of the imported entity, for the logs.
+            records_label: The name of the imported records, for the logs.
+            force: Whether to import the file even if it did not change.
+
+        Returns:
+            False if the import was skipped because it would give the same result as the last
+            one, True otherwise.
+        """
+        file_path = os.path.join(path, file_name)
+        _logger.info(f"Starting import of {records_label} from: {file_path}")
+        config = self.env['ir.config_parameter'].sudo()
         try:
-            with open(device_file_path, 'r', encoding='utf-8') as file:
-                raw_content = file.read()
-                cleaned_data = csv_cleaner.clean_device_data(raw_content, delimiter)
+            # Each file is imported as a whole or not at all: an error partway through, e.g. an
+            # invalid byte in a later chunk of the file, rolls back the batches already written.
+            # It also keeps a failed statement from aborting the transaction for the next file.
+            with self.env.cr.savepoint():
+                # Formatted like the cleaned expire dates, so both compare correctly as strings.
+                now = datetime.now().isoformat(' ', 'seconds')
+                digest = _file_digest(file_path, delimiter)
+                # Rows are disabled once their expire date passed, so the last import only holds
+                # until the first of its rows expires.
+                if (not force and digest == config.get_param(hash_param)
+                        and now < config.get_param(expiry_param, '')):
+                    _logger.info("%s CSV file is unchanged since the last import, skipping it.", entity.capitalize())
+                    return False
+
+                with open(file_path, 'r', encoding='utf-8', buffering=READ_BUFFER_SIZE) as file:
+                    # The file is cleaned and written in batches, so it is never held in memory as a whole.
+                    cleaned_data = clean_data(file, delimiter)
+                    created = updated = unchanged = 0
+                    next_expiry = NO_EXPIRY
+                    for rows in split_every(BATCH_SIZE, cleaned_data, list):
+                        batch_created, batch_updated, batch_unchanged = import_batch(rows, now)
+                        created += batch_created
+                        updated += batch_updated
+                        unchanged += batch_unchanged
+                        next_expiry = min([next_expiry, *(row['expire_date'] for row in rows
+                                                          if row['expire_date'] >= now)])
 
-                data_by_code = {row['code']: row for row in cleaned_data}
-                csv_codes = list(data_by_code.keys())
+                    _logger.info("Created %d new %s, updated %d existing ones and skipped %d unchanged ones in bulk.",
+                                 created, records_label, updated, unchanged)
 
-                existing_devices = self.env['assignment_ftp_interface.device'].search([('code', 'in', csv_codes)])
+                config.set_param(hash_param, digest)
+                config.set_param(expiry_param, next_expiry)
 
-                odoo_devices_by_code = {dev.code: dev for dev in existing_devices}
+        except FileNotFoundError:
+            _logger.error(f"{entity.capitalize()} CSV file not found at: {file_path}")
+        except Exception as e:
+            _logger.error(f"An unexpected error occurred during {entity} import: {e}", exc_info=True)
+        return True
+
+    @api.model
+    def _import_devices(self, path, delimiter):
+        """
+        Imports devices.csv through _import_file.
 
-                devices_to_create_vals = []
+        Returns:
+            False if the import was skipped because it would give the same result as the last
+            one, True otherwise.
+        """
+        return self._import_file(
+            path, 'devices.csv', delimiter, DEVICES_HASH_PARAM, DEVICES_EXPIRY_PARAM,
+            csv_cleaner.clean_device_data, self._import_device_batch, 'device', 'devices')
 
-                for code, row in data_by_code.items():
-                    expire_date_obj = datetime.strptime(row['expire_date'], '%Y-%m-%d %H:%M:%S')
-                    state = 'disabled' if expire_date_obj < datetime.now() else row.get('state', 'enabled')
+    @api.model
+    def _import_device_batch(self, rows, now):
+        """
+        Creates or updates, matched on their code, the devices of a batch of cleaned rows.
 
-                    vals = {
-                        'device_id': row['id'],
-                        'name': row['name'],
-                        'description': row['description'],
-                        'code': row['code'],
-                        'expire_date': expire_date_obj.strftime('%Y-%m-%d %H:%M:%S'),
-                        'state': state,
-                    }
+        Returns:
+            A tuple with the number of devices created, updated and left unchanged.
+        """
+        vals_list = []
+        for row in rows:
+            # The cleaner already formats expire_date as 'YYYY-MM-DD HH:MM:SS', which PostgreSQL
+            # accepts as is and which orders like the dates it represents, so it is never parsed.
+            expire_date_str = row['expire_date']
+            state = 'disabled' if expire_date_str < now else row.get('state', 'enabled')
 
-                    if code in odoo_devices_by_code:
-                        device_to_update = odoo_devices_by_code[code]
-                        device_to_update.write(vals)
-                        _logger.info(f"Updating device with code: {code}")
-                    else:
-                        devices_to_create_vals.append(vals)
+            vals_list.append({
+                'device_id': row['id'],
+                'name': row['name'],
+                'description': row['description'],
+                'code': row['code'],
+                'expire_date': expire_date_str,
+                'state': state,
+            })
 
-                if devices_to_create_vals:
-                    self.env['assignment_ftp_interface.device'].create(devices_to_create_vals)
-                    _logger.info(f"Created {len(devices_to_create_vals)} new devices in bulk.")
+        created, updated = self._bulk_upsert(self.env['assignment_ftp_interface.device'], vals_list, 'code')
+        return created, updated, len(vals_list) - created - updated
 
+    @api.model
+    def _import_content(self, path, delimiter, devices_changed=True):
+        """
+        Imports content.csv through _import_file.
 
-        except FileNotFoundError:
-            _logger.error(f"Device CSV file not found at: {device_file_path}")
-        except Exception as e:
-            _logger.error(f"An unexpected error occurred during device import: {e}", exc_info=True)
+        Args:
+            devices_changed: Whether the devices may have changed since the last import. Rows
+                are linked to their devices, so the import is then never skipped.
+        """
+        self._import_file(
+            path, 'content.csv', delimiter, CONTENT_HASH_PARAM, CONTENT_EXPIRY_PARAM,
+            csv_cleaner.clean_content_data, self._import_content_batch, 'content', 'content records',
+            force=devices_changed)
 
     @api.model
-    def _import_content(self, path, delimiter):
-        content_file_path = os.path.join(path, 'content.csv')
-        _logger.info(f"Starting BULK import of content from: {content_file_path}")
-        try:
-            with open(content_file_path, 'r', encoding='utf-8') as file:
-                raw_content = file.read()
-                cleaned_data = csv_cleaner.clean_content_data(raw_content, delimiter)
-
-                all_devices = self.env['assignment_ftp_interface.device'].search([])
-                devices_by_ext_id = {dev.device_id: dev.id for dev in all_devices if dev.device_id}
-
-                data_by_id = {row['id']: row for row in cleaned_data}
-                csv_ids = list(data_by_id.keys())
-
-                existing_content = self.env['assignment_ftp_interface.content'].search(
-                    [('content_id', 'in', csv_ids)])
-                odoo_content_by_ext_id = {c.content_id: c for c in existing_content}
-
-                content_to_create_vals = []
-
-                for ext_id, row in data_by_id.items():
-                    device_id = devices_by_ext_id.get(row['device_external_id'])
-                    if not device_id:
-                        _logger.error(f"Device link not found for content with content ID {ext_id}. Skipping.")
-                        continue
-
-                    expire_date_obj = datetime.strptime(row['expire_date'], '%Y-%m-%d %H:%M:%S')
-                    state = 'disabled' if expire_date_obj < datetime.now() else row.get('state', 'enabled')
-
-                    vals = {
-                        'content_id': ext_id,
-                        'name': row['name'],
-                        'description': row['description'],
-                        'device': device_id,
-                        'expire_date': expire_date_obj.strftime('%Y-%m-%d %H:%M:%S'),
-                        'state': state,
-                    }
-
-                    if ext_id in odoo_content_by_ext_id:
-                        content_to_update = odoo_content_by_ext_id[ext_id]
-                        content_to_update.write(vals)
-                        _logger.info(f"Updating content with content ID: {ext_id}")
-                    else:
-                        content_to_create_vals.append(vals)
-
-                if content_to_create_vals:
-                    self.env['assignment_ftp_interface.content'].create(content_to_create_vals)
-                    _logger.info(f"Created {len(content_to_create_vals)} new content records in bulk.")
+    def _create_content_import_table(self):
+        """
+        Creates the temporary table the content batches are copied into, unless it exists
+        already. It lives until the end of the transaction, and is emptied by every batch.
+        """
+        # The cleaner accepts any all-digit field as device ID, so device_external_id is a
+        # bigint: IDs too large for any device then fail to link instead of failing the COPY.
+        self.env.cr.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS "{CONTENT_IMPORT_TABLE}" (
+                content_id integer, name varchar, description varchar,
+                device_external_id bigint, device integer,
+                expire_date timestamp, state varchar
+            ) ON COMMIT DROP
+        """)
 
-        except FileNotFoundError:
-            _logger.error(f"Content CSV file not found at: {content_file_path}")
-        except Exception as e:
-            _logger.error(f"An unexpected error occurred during content import: {e}", exc_info=True)
\ No newline at end of file
+    @api.model
+    def _import_content_batch(self, rows, now):
+        """
+        Creates or updates, matched on their content ID, the content records of a batch of
+        cleaned rows. The rows are copied into the import table first, so linking them to
+        their devices and telling new records from existing ones is done by PostgreSQL.
+
+        Returns:
+            A tuple with the number of content records created, updated and left unchanged.
+        """
+        cr = self.env.cr
+
+        # Write pending ORM changes first, so the joins below see them and they cannot
+        # overwrite ours when flushed later.
+        self.env['assignment_ftp_interface.device'].flush_model(['device_id'])
+        self.env['assignment_ftp_interface.content'].flush_model()
+
+        self._create_content_import_table()
+        cr.execute(f'TRUNCATE "{CONTENT_IMPORT_TABLE}"')
+        self._copy_rows(
+            CONTENT_IMPORT_TABLE,
+            ['content_id', 'name', 'description', 'device_external_id', 'expire_date', 'state'],
+            ((row['id'], row['name'], row['description'], row['device_external_id'], row['expire_date'],
+              'disabled' if row['expire_date'] < now else row.get('state', 'enabled'))
+             for row in rows))
+
+        # Link every row to its device; when several devices share a device ID the last
+        # created one wins, and rows without one are dropped.
+        cr.execute(f"""
+            UPDATE "{CONTENT_IMPORT_TABLE}" AS i
+               SET device = (SELECT max(d.id) FROM assignment_ftp_interface_device AS d
+                              WHERE d.device_id = i.device_external_id)
+        """)
+        cr.execute(f'DELETE FROM "{CONTENT_IMPORT_TABLE}" WHERE device IS NULL RETURNING content_id')
+        unlinked = cr.fetchall()
+        for ext_id, in unlinked:
+            _logger.error(f"Device link not found for content with content ID {ext_id}. Skipping.")
+
+        # Existing records are updated before the new ones are inserted, so that the UPDATE
+        # does not match the inserted records too. Records already holding the row's values
+        # are left untouched.
+        cr.execute(f"""
+            UPDATE assignment_ftp_interface_content AS c
+               SET name = i.name, description = i.description, device = i.device,
+                   expire_date = i.expire_date, state = i.state,
+                   write_uid = %(uid)s, write_date = (now() at time zone 'UTC')
+              FROM "{CONTENT_IMPORT_TABLE}" AS i
+             WHERE c.content_id = i.content_id
+               AND (c.name, c.description, c.device, c.expire_date, c.state)
+                   IS DISTINCT FROM (i.name, i.description, i.device, i.expire_date, i.state)
+        """, {'uid': self.env.uid})
+        updated = cr.rowcount
+
+        cr.execute(f"""
+            INSERT INTO assignment_ftp_interface_content
+                   (content_id, name, description, device, expire_date, state,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT i.content_id, i.name, i.description, i.device, i.expire_date, i.state,
+                   %(uid)s, (now() at time zone 'UTC'), %(uid)s, (now() at time zone 'UTC')
+              FROM "{CONTENT_IMPORT_TABLE}" AS i
+             WHERE NOT EXISTS (SELECT 1 FROM assignment_ftp_interface_content AS c
+                                WHERE c.content_id = i.content_id)
+        """, {'uid': self.env.uid})
+        created = cr.rowcount
+
+        # The records were changed behind the ORM's back, including the content_ids of their
+        # devices, so the whole cache is dropped.
+        self.env.invalidate_all()
+        return created, updated, len(rows) - len(unlinked) - created - updated
@@ -0,0 +1,221 @@
+import os
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+from ..models import csv_importer
+from ..utils import csv_cleaner
+
+LOGGER = 'odoo.addons.assignment_ftp_interface.models.csv_importer'
+
+DEVICES_CSV = (
+    '42,"Device","A device",DEV0042, 2099-01-01 00:00:00, enabled\n'
+    '43,"Old device","Expired",DEV0043, 2000-01-01 00:00:00, enabled\n'
+    '44,"Later","Expires first",DEV0044, 2098-06-01 12:00:00, deleted\n'
+)
+
+CONTENT_CSV = (
+    '1,"Content","A content",42, 2099-01-01 00:00:00, enabled\n'
+    '2,"Old content","Expired",43, 2000-01-01 00:00:00, enabled\n'
+)
+
+
+@tagged('post_install', '-at_install')
+class TestCsvImporter(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.importer = cls.env['assignment_ftp_interface.csv_importer']
+        cls.Device = cls.env['assignment_ftp_interface.device']
+        cls.Content = cls.env['assignment_ftp_interface.content']
+        cls.now = '2025-01-01 00:00:00'
+
+    def _device_row(self, **values):
+        return dict({
+            'id': 42,
+            'name': 'Device',
+            'description': 'A device',
+            'code': 'DEV0042',
+            'expire_date': '2099-01-01 00:00:00',
+            'state': 'enabled',
+        }, **values)
+
+    def _content_row(self, **values):
+        return dict({
+            'id': 1,
+            'name': 'Content',
+            'description': 'A content',
+            'device_external_id': 42,
+            'expire_date': '2099-01-01 00:00:00',
+            'state': 'enabled',
+        }, **values)
+
+    def _write_csv_files(self, devices=DEVICES_CSV, content=CONTENT_CSV):
+        for file_name, data in (('devices.csv', devices), ('content.csv', content)):
+            with open(os.path.join(self.csv_path, file_name), 'w', encoding='utf-8') as file:
+                file.write(data)
+
+    def _setup_csv_files(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.csv_path = directory.name
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('assignment_ftp_interface.csv_import_path', self.csv_path)
+        config.set_param('assignment_ftp_interface.csv_delimiter', ',')
+        self._write_csv_files()
+
+    def test_device_batch_create_update_unchanged(self):
+        """The device upsert tells created, updated and unchanged devices apart."""
+        self.assertEqual(self.importer._import_device_batch([self._device_row()], self.now), (1, 0, 0))
+        device = self.Device.search([('code', '=', 'DEV0042')])
+        self.assertRecordValues(device, [{
+            'device_id': 42,
+            'name': 'Device',
+            'description': 'A device',
+            'expire_date': datetime(2099, 1, 1),
+            'state': 'enabled',
+        }])
+
+        self.assertEqual(self.importer._import_device_batch([self._device_row()], self.now), (0, 0, 1))
+
+        rows = [self._device_row(name='Renamed', state='deleted'), self._device_row(id=43, code='DEV0043')]
+        self.assertEqual(self.importer._import_device_batch(rows, self.now), (1, 1, 0))
+        self.assertRecordValues(device, [{'device_id': 42, 'name': 'Renamed', 'state': 'deleted'}])
+        self.assertEqual(self.Device.search_count([('code', 'in', ['DEV0042', 'DEV0043'])]), 2)
+
+    def test_expired_device_is_disabled(self):
+        """A device whose expire date has passed is imported as disabled."""
+        self.importer._import_device_batch([self._device_row(expire_date='2000-01-01 00:00:00')], self.now)
+        device = self.Device.search([('code', '=', 'DEV0042')])
+        self.assertEqual(device.state, 'disabled')
+
+    def test_content_batch_create_update_unchanged(self):
+        """The content diff against the database tells created, updated and unchanged records apart."""
+        self.importer._import_device_batch(
+            [self._device_row(), self._device_row(id=43, code='DEV0043')], self.now)
+        device_42 = self.Device.search([('device_id', '=', 42)])
+        device_43 = self.Device.search([('device_id', '=', 43)])
+
+        self.assertEqual(self.importer._import_content_batch([self._content_row()], self.now), (1, 0, 0))
+        content = self.Content.search([('content_id', '=', 1)])
+        self.assertRecordValues(content, [{
+            'name': 'Content',
+            'description': 'A content',
+            'device': device_42.id,
+            'expire_date': datetime(2099, 1, 1),
+            'state': 'enabled',
+        }])
+        self.assertEqual(device_42.content_ids, content)
+
+        self.assertEqual(self.importer._import_content_batch([self._content_row()], self.now), (0, 0, 1))
+
+        rows = [self._content_row(name='Renamed', device_external_id=43), self._content_row(id=2)]
+        self.assertEqual(self.importer._import_content_batch(rows, self.now), (1, 1, 0))
+        self.assertRecordValues(content, [{'name': 'Renamed', 'device': device_43.id}])
+        self.assertEqual(self.Content.search_count([('content_id', 'in', [1, 2])]), 2)
+
+    def test_expired_content_is_disabled(self):
+        """A content record whose expire date has passed is imported as disabled."""
+        self.importer._import_device_batch([self._device_row()], self.now)
+        self.importer._import_content_batch([self._content_row(expire_date='2000-01-01 00:00:00')], self.now)
+        content = self.Content.search([('content_id', '=', 1)])
+        self.assertEqual(content.state, 'disabled')
+
+    def test_content_with_unknown_large_device_id_is_skipped(self):
+        """A device ID outside the integer range only skips its own row."""
+        self.importer._import_device_batch([self._device_row()], self.now)
+        rows = list(csv_cleaner.clean_content_data(
+            '7,"Name","desc",99999999999, 2099-01-01 10:00:00, enabled\n'
+            '8,"Other","desc",42, 2099-01-01 10:00:00, enabled', ','))
+        self.assertEqual(rows[0]['device_external_id'], 99999999999)
+
+        with self.assertLogs(LOGGER, 'ERROR') as logs:
+            result = self.importer._import_content_batch(rows, self.now)
+
+        self.assertEqual(result, (1, 0, 0))
+        self.assertIn("Device link not found for content with content ID 7", logs.output[0])
+        content = self.Content.search([('content_id', 'in', [7, 8])])
+        self.assertEqual(content.mapped('content_id'), [8])
+        self.assertEqual(content.device.code, 'DEV0042')
+
+    def test_import_csv_data(self):
+        """A full import creates the rows of both files and stores their digest and next expiry."""
+        self._setup_csv_files()
+        self.assertTrue(self.importer.import_csv_data())
+
+        self.assertRecordValues(self.Device.search([('code', 'like', 'DEV00')], order='device_id'), [
+            {'device_id': 42, 'state': 'enabled'},
+            {'device_id': 43, 'state': 'disabled'},
+            {'device_id': 44, 'state': 'deleted'},
+        ])
+        self.assertRecordValues(self.Content.search([('content_id', 'in', [1, 2])], order='content_id'), [
+            {'content_id': 1, 'state': 'enabled'},
+            {'content_id': 2, 'state': 'disabled'},
+        ])
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        self.assertTrue(get_param(csv_importer.DEVICES_HASH_PARAM))
+        self.assertTrue(get_param(csv_importer.CONTENT_HASH_PARAM))
+        self.assertEqual(get_param(csv_importer.DEVICES_EXPIRY_PARAM), '2098-06-01 12:00:00')
+        self.assertEqual(get_param(csv_importer.CONTENT_EXPIRY_PARAM), '2099-01-01 00:00:00')
+
+    def test_unchanged_files_are_skipped(self):
+        """A second import of unchanged files writes nothing."""
+        self._setup_csv_files()
+        self.importer.import_csv_data()
+        device = self.Device.search([('code', '=', 'DEV0042')])
+        content = self.Content.search([('content_id', '=', 1)])
+        device.name = 'Edited'
+        content.name = 'Edited'
+
+        with self.assertLogs(LOGGER, 'INFO') as logs:
+            self.importer.import_csv_data()
+
+        output = '\n'.join(logs.output)
+        self.assertIn("Device CSV file is unchanged since the last import, skipping it.", output)
+        self.assertIn("Content CSV file is unchanged since the last import, skipping it.", output)
+        self.assertEqual(device.name, 'Edited')
+        self.assertEqual(content.name, 'Edited')
+
+    def test_unchanged_file_is_imported_after_next_expiry(self):
+        """An unchanged file is imported again once one of its rows may have expired."""
+        self._setup_csv_files()
+        self.importer.import_csv_data()
+        device = self.Device.search([('code', '=', 'DEV0044')])
+        device.name = 'Edited'
+        self.env['ir.config_parameter'].sudo().set_param(csv_importer.DEVICES_EXPIRY_PARAM, '2000-01-01 00:00:00')
+
+        self.importer.import_csv_data()
+
+        self.assertEqual(device.name, 'Later')
+
+    def test_unchanged_content_is_imported_after_device_change(self):
+        """An unchanged content file is imported again when the devices changed."""
+        self._setup_csv_files()
+        self.importer.import_csv_data()
+        content = self.Content.search([('content_id', '=', 1)])
+        content.name = 'Edited'
+        self._write_csv_files(devices=DEVICES_CSV + '45,"New device","Added",DEV0045, 2099-01-01 00:00:00, enabled\n')
+
+        self.importer.import_csv_data()
+
+        self.assertTrue(self.Device.search([('code', '=', 'DEV0045')]))
+        self.assertEqual(content.name, 'Content')
+
+    def test_failed_file_is_rolled_back(self):
+        """An error partway through a file rolls back the batches written before it."""
+        self._setup_csv_files()
+        lines = ''.join(f'{i},"Device {i}","Batch",DEV{i:04d}, 2099-01-01 00:00:00, enabled\n'
+                        for i in range(1000, 1400))
+        with open(os.path.join(self.csv_path, 'devices.csv'), 'wb') as file:
+            file.write(lines.encode() + b'\xff\n')
+
+        # Import every line on its own, so that rows are written before the invalid byte is read.
+        with patch.object(csv_importer, 'BATCH_SIZE', 1), patch.object(csv_cleaner, '_CHUNK_LINES', 1), \
+                self.assertLogs(LOGGER, 'ERROR') as logs:
+            self.importer._import_devices(self.csv_path, ',')
+
+        self.assertIn("An unexpected error occurred during device import", logs.output[0])
+        self.assertFalse(self.Device.search([('code', '=', 'DEV1000')]))
+        self.assertFalse(self.env['ir.config_parameter'].sudo().get_param(csv_importer.DEVICES_HASH_PARAM))
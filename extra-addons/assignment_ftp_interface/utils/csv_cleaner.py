@@ -1,40 +1,81 @@
 from datetime import datetime, timedelta
+import functools
+from itertools import islice
 import logging
 import re
-from typing import Optional, List, Dict, Any, Tuple, Set
+from typing import Optional, List, Dict, Any, Tuple, Set, Iterator, Iterable, Callable, Union
 
 _logger = logging.getLogger(__name__)
 
+# --- PRE-COMPILED PATTERNS ---
+# These stay on the standard 're' engine: google-re2 was measured ~6x slower on this
+# workload (short strings, per-call overhead dominates) and its ASCII-only \s and \d
+# would silently change which rows survive cleaning.
+
+_TS_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})\s+'  # Date: YYYY-MM-DD
+    r'(\d{2}):(\d{2}):(\d{2})'  # Time: HH:MM:SS
+    r'(?:\.(\d+))?'  # Milliseconds
+    r'([+-]\d{2}:\d{2})?'  # Timezone
+)
+_NUM_QUOTE_RE = re.compile(r'(?<=\d)"')
+# The preprocessing patterns run over the whole raw blob at once, so their whitespace
+# classes exclude newlines to keep every substitution confined to a single line.
+_QQ_RE = re.compile(r'"[^\S\n]*"')
+_NON_DIGIT_RE = re.compile(r'\D')
+# Deletion table stripping every ASCII non-digit; str.translate avoids the regex engine.
+_KEEP_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isdigit()))
+
+_STATUSES = frozenset(('enabled', 'deleted'))
+
+# Number of lines read and pre-processed at once when cleaning from a file or other line iterable.
+_CHUNK_LINES = 10000
+
+@functools.lru_cache(maxsize=8)
+def _delimiter_re(delimiter: str) -> re.Pattern:
+    """
+    Returns the compiled pattern matching a delimiter and its surrounding whitespace
+    (newlines excluded). Cached, since the delimiter rarely changes between imports.
+    """
+    return re.compile(r'[^\S\n]*' + re.escape(delimiter) + r'[^\S\n]*')
+
 # --- DATETIME HELPER FUNCTIONS ---
 
-def _fix_malformed_timestamp(timestamp_str: str) -> Optional[datetime]:
+def _fix_malformed_timestamp(match: re.Match) -> Optional[datetime]:
     """
-    Corrects a malformed timestamp string by parsing its components and using timedelta
-    to handle rollovers (e.g., 66 seconds becomes 1 minute, 6 seconds).
+    Corrects a malformed timestamp by converting the components captured by _TS_RE.
+    Well-formed ones are parsed by the ISO parser; the others fall back to building the
+    datetime from the components, with out-of-range times going through timedelta to
+    handle rollovers (e.g., 66 seconds becomes 1 minute, 6 seconds).
 
     Args:
-        timestamp_str: The raw timestamp string to fix.
+        match: A _TS_RE match of the raw timestamp to fix.
 
     Returns:
-        A corrected datetime object, or None if the format is unrecognizable.
+        A corrected datetime object, or None if no valid date can be built.
     """
-    pattern = re.compile(
-        r'(\d{4})-(\d{2})-(\d{2})\s+'  # Date: YYYY-MM-DD
-        r'(\d{2}):(\d{2}):(\d{2})'  # Time: HH:MM:SS
-        r'(?:\.(\d+))?'  # Milliseconds
-        r'([+-]\d{2}:\d{2})?'  # Timezone
-    )
-    match = pattern.match(timestamp_str)
-
-    if not match:
-        _logger.error(f"Timestamp format not recognized: {timestamp_str}")
-        return None
-
+    # Fast path: in-range times are handed to the C ISO parser. The 2-digit components
+    # compare correctly as strings, so no int() conversion is needed for the check.
+    # The offset is dropped, as the component path below ignores it as well.
+    hour_str, minute_str, second_str = match.group(4, 5, 6)
+    if hour_str < '24' and minute_str < '60' and second_str < '60':
+        try:
+            return datetime.fromisoformat(match.group()).replace(tzinfo=None)
+        except ValueError:
+            pass  # e.g. an invalid day; the component path below logs why
+
+    # Fallback: the components are converted one by one.
     parts = match.groups()
     year, month, day, hour, minute, second = [int(p) for p in parts[:6]]
     microsecond = int(parts[6].ljust(6, '0')[:6]) if parts[6] else 0
 
     try:
+        # In-range times only get here when the ISO parser rejected the text, e.g. for an
+        # unusual separator; they need no rollover, so skip the timedelta arithmetic. An
+        # invalid day raises here and is logged below.
+        if hour < 24 and minute < 60 and second < 60:
+            return datetime(year, month, day, hour, minute, second, microsecond)
+
         base_date = datetime(year, month, day)
         corrected_dt = base_date + timedelta(
             hours=hour,
@@ -45,35 +86,13 @@ def _fix_malformed_timestamp(timestamp_str: str) -> Optional[datetime]:
         return corrected_dt
 
     except (ValueError, OverflowError) as e:
-        _logger.error(f"Could not construct a valid date from '{timestamp_str}': {e}")
-        return None
-
-def _extract_latest_datetime_str(text: str) -> Optional[str]:
-    """
-    Finds all datetime-like strings in a line of text and returns the most recent one.
-
-    Args:
-        text: A string which may contain multiple datetimes.
-
-    Returns:
-        The string of the latest datetime found, or None.
-    """
-    pattern = r'\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:\d{2})?'
-    matches = re.findall(pattern, text)
-
-    if not matches:
-        _logger.info(f"No datetime patterns found in text: {text}")
+        _logger.error(f"Could not construct a valid date from '{match.group()}': {e}")
         return None
 
-    if len(matches) > 1:
-        _logger.info(f"Multiple datetimes found: {matches}. Selecting the latest.")
-        return max(matches)
-
-    return matches[0]
-
 def _parse_and_clean_datetime(text: str, line_num: int) -> Optional[datetime]:
     """
-    Orchestrates the process of finding, cleaning, and parsing a datetime from a raw string.
+    Finds all datetime-like strings in a raw string in a single regex pass and
+    cleans and parses the most recent one.
 
     Args:
         text: The raw string from the CSV line.
@@ -82,44 +101,98 @@ def _parse_and_clean_datetime(text: str, line_num: int) -> Optional[datetime]:
     Returns:
         A valid datetime object or None if the process fails.
     """
-    latest_datetime_str = _extract_latest_datetime_str(text)
-
-    if not latest_datetime_str:
+    latest_match = None
+    match_count = 0
+    for match in _TS_RE.finditer(text):
+        match_count += 1
+        if latest_match is None or match.group() > latest_match.group():
+            latest_match = match
+
+    if latest_match is None:
+        _logger.info("No datetime patterns found in text: %s", text)
         _logger.error(f"Line {line_num}: No valid datetime pattern found.")
         return None
 
-    cleaned_datetime = _fix_malformed_timestamp(latest_datetime_str)
+    if match_count > 1:
+        _logger.info("Multiple datetimes found (%d). Selecting the latest: %s", match_count, latest_match.group())
+
+    cleaned_datetime = _fix_malformed_timestamp(latest_match)
 
     if not cleaned_datetime:
         _logger.error(
-            f"Line {line_num}: Could not fix or parse the datetime string '{latest_datetime_str}'.")
+            f"Line {line_num}: Could not fix or parse the datetime string '{latest_match.group()}'.")
         return None
 
     return cleaned_datetime
 
 # --- GENERAL HELPER FUNCTIONS ---
 
-def _preprocess_and_split_line(line: str, delimiter: str) -> List[str]:
+def _iter_lines(data: str) -> Iterator[str]:
+    """
+    Yields the '\n'-separated lines of a string one at a time. Unlike str.split, this
+    never materializes the full list of lines, which costs several times the input size.
+    """
+    start = 0
+    while True:
+        end = data.find('\n', start)
+        if end == -1:
+            yield data[start:]
+            return
+        yield data[start:end]
+        start = end + 1
+
+def _iter_chunks(raw_data: Union[str, Iterable[str]]) -> Iterator[str]:
     """
-    Pre-processes a raw CSV line to handle specific malformations like
-    missing delimiters between an ID and a quoted field, then splits it into a list of fields.
+    Yields the raw data as blocks of whole lines without their final line break. A string
+    is a single block; an iterable of lines (e.g. an open file) is read _CHUNK_LINES at a
+    time, so only one block needs to be held in memory.
+    """
+    if isinstance(raw_data, str):
+        yield raw_data
+        return
+
+    lines = iter(raw_data)
+    while True:
+        chunk = ''.join(islice(lines, _CHUNK_LINES))
+        if not chunk:
+            return
+        yield chunk[:-1] if chunk.endswith('\n') else chunk
+
+def _preprocess_data(raw_data: str, delimiter: str) -> str:
+    """
+    Pre-processes the raw CSV data to handle specific malformations like missing
+    delimiters between an ID and a quoted field.
+
+    Each substitution is a single regex sweep over the whole blob instead of one call
+    per line. None of the patterns can match a newline, so the lines of the result
+    stay aligned with those of raw_data.
     """
-    # Add a delimiter between a number and a quote if it's missing
-    corrected_line = re.sub(r'(\d)(")', r'\1' + delimiter + r'\2', line.strip())
+    # Add a delimiter between a number and a quote if it's missing. The replacement is
+    # a plain literal (no group references), so re substitutes it without template expansion.
+    corrected_data = _NUM_QUOTE_RE.sub(delimiter + '"', raw_data)
 
     # This regex finds a closing quote, optional whitespace, and an opening quote,
     # and replaces it with a sequence of quote, delimiter, quote to ensure separation.
-    corrected_line = re.sub(r'"\s*"', f'"{delimiter}"', corrected_line)
+    corrected_data = _QQ_RE.sub(f'"{delimiter}"', corrected_data)
 
-    # Standardize delimiters by removing whitespace around them and remove any trailing delimiter.
-    standardized_line = re.sub(r'\s*' + re.escape(delimiter) + r'\s*', delimiter, corrected_line).rstrip(delimiter)
+    # Standardize delimiters by removing whitespace around them.
+    return _delimiter_re(delimiter).sub(delimiter, corrected_data)
 
-    # Split into a list of fields.
-    return standardized_line.split(delimiter)
+def _split_line(line: str, delimiter: str) -> List[str]:
+    """
+    Removes any trailing delimiter from a pre-processed line and splits it into a list of fields.
+    Whitespace around delimiters was removed by _preprocess_data, so every field is already
+    trimmed and the helpers below do not strip them again.
+    """
+    return line.strip().rstrip(delimiter).split(delimiter)
 
 def _process_id(id_field: str, seen_ids: Set[int], line_num: int, original_line: str) -> Optional[int]:
     """Validates and processes the ID field, checking for duplicates."""
-    id_str = re.sub(r'\D', '', id_field)
+    if id_field.isascii():
+        id_str = id_field if id_field.isdigit() else id_field.translate(_KEEP_DIGITS)
+    else:
+        # Non-ASCII input may hold other Unicode digits, which only the regex knows about.
+        id_str = _NON_DIGIT_RE.sub('', id_field)
     if not id_str:
         _logger.error(f"Line {line_num}: DISCARDED - No numeric ID found. Original line: '{original_line}'")
         return None
@@ -135,20 +208,30 @@ def _process_id(id_field: str, seen_ids: Set[int], line_num: int, original_line:
 def _extract_status(fields: List[str]) -> str:
     """Extracts the status ('enabled' or 'deleted') from a list of fields."""
     for field in fields:
-        if field.lower().strip() in ['enabled', 'deleted']:
-            return field.lower().strip()
+        status = field.lower()
+        if status in _STATUSES:
+            return status
     return 'enabled'
 
+def _is_device_code(value: str) -> bool:
+    """
+    Checks whether a field is a device code: 4 to 30 characters of A-Z and 0-9.
+    Plain string predicates are used instead of a regex, so most fields are rejected
+    by the length check alone.
+    """
+    # isupper() needs at least one letter, so an all-digit code is accepted via isdigit().
+    return (4 <= len(value) <= 30 and value.isascii() and value.isalnum()
+            and (value.isupper() or value.isdigit()))
+
 def _find_device_code(fields: List[str], seen_codes: Set[str], line_num: int, original_line: str) -> Optional[Tuple[str, int]]:
     """Finds the device code and its index, checking for duplicates."""
     for idx, field in enumerate(fields):
-        cleaned_field = field.strip()
-        if re.match(r'^[A-Z0-9]{4,30}$', cleaned_field):
-            if cleaned_field in seen_codes:
+        if _is_device_code(field):
+            if field in seen_codes:
                 _logger.error(
-                    f"Line {line_num}: DISCARDED - Duplicate code '{cleaned_field}' found. Original line: '{original_line}'")
+                    f"Line {line_num}: DISCARDED - Duplicate code '{field}' found. Original line: '{original_line}'")
                 return None
-            return cleaned_field, idx
+            return field, idx
 
     _logger.error(
         f"Line {line_num}: DISCARDED - No potential serial number/code found. Original line: '{original_line}'")
@@ -157,14 +240,14 @@ def _find_device_code(fields: List[str], seen_codes: Set[str], line_num: int, or
 def _extract_name_and_description(fields: List[str], code_index: int, entity_id: int) -> Tuple[str, str]:
     """Extracts the name and description based on a key field's position."""
     if len(fields) > 1:
-        name = fields[1].strip().strip('"')
+        name = fields[1].strip('"')
     else:
         name = f"Entity {entity_id}"
 
     description_parts = []
     if code_index > 2:
         description_parts = fields[2:code_index]
-    description = " ".join(part.strip().strip('"') for part in description_parts)
+    description = " ".join(part.strip('"') for part in description_parts)
 
     return name, description
 
@@ -182,165 +265,160 @@ def _find_content_device_id(fields: List[str], line_num: int, original_line: str
     """
     # Iterate backwards from the third-to-last field to avoid status/dates
     for idx in range(len(fields) - 3, 0, -1):
-        cleaned_field = fields[idx].strip()
-        if cleaned_field.isdigit():
-            return int(cleaned_field), idx
+        field = fields[idx]
+        if field.isdigit():
+            return int(field), idx
 
     _logger.error(
         f"Line {line_num}: DISCARDED - Could not find a numeric device ID. Original line: '{original_line}'")
     return None
 
-# --- MAIN PUBLIC FUNCTIONS ---
-
-def clean_device_data(raw_data: str, delimiter: str) -> List[Dict[str, Any]]:
+# --- ROW BUILDERS ---
+
+def _build_device_row(entity_id: int, name: str, description: str, code: str,
+                      expire_date: str, status: str, line_num: int) -> Dict[str, Any]:
+    """Validates the field lengths of a device row and assembles its clean data dictionary."""
+    # The length checks are inlined so rows that fit skip the _truncate_field call.
+    return {
+        'id': entity_id,
+        'name': name if len(name) <= 32 else _truncate_field(name, 32, "Name", line_num),
+        'description': (description if len(description) <= 128
+                        else _truncate_field(description, 128, "Description", line_num)),
+        'code': code,
+        'expire_date': expire_date,
+        'state': status
+    }
+
+def _build_content_row(entity_id: int, name: str, description: str, device_external_id: int,
+                       expire_date: str, status: str, line_num: int) -> Dict[str, Any]:
+    """Validates the field lengths of a content row and assembles its clean data dictionary."""
+    # The length checks are inlined so rows that fit skip the _truncate_field call.
+    return {
+        'id': entity_id,
+        'name': name if len(name) <= 100 else _truncate_field(name, 100, "Content Name", line_num),
+        'description': (description if len(description) <= 128
+                        else _truncate_field(description, 128, "Content Description", line_num)),
+        'device_external_id': device_external_id,
+        'expire_date': expire_date,
+        'state': status
+    }
+
+def _clean_rows(raw_data: Union[str, Iterable[str]], delimiter: str, entity: str,
+                find_key: Callable[..., Optional[Tuple[Any, int]]],
+                build_row: Callable[..., Dict[str, Any]], unique_keys: bool) -> Iterator[Dict[str, Any]]:
     """
-    Cleans and validates raw CSV data for device import with detailed logging.
+    Shared cleaning loop for all entity types.
+
+    Args:
+        raw_data: The raw CSV data, either as one string or as an iterable of lines.
+        delimiter: The CSV delimiter.
+        entity: The entity name used in log messages (e.g. 'device').
+        find_key: Locates the entity's key field (device code, content device ID) and
+            its index, given the fields, the line number and the original line; for unique
+            keys, the keys of already accepted rows are passed after the fields. Returns
+            None to discard the row.
+        build_row: Assembles the clean data dictionary from the ID, name, description,
+            key, expire date, status and line number.
+        unique_keys: Whether each key may only be used by one row, as for device codes.
+            Several content rows may link to the same device.
+
+    Yields:
+        The cleaned rows, one at a time.
     """
-    cleaned_rows = []
+    success_rows = 0
     seen_ids = set()
-    seen_codes = set()
+    seen_keys = set() if unique_keys else None
     discarded_rows = 0
+    pending_empty_lines = 0
+    i = 0
+
+    _logger.info(f"Starting cleaning process for raw {entity} lines.")
+
+    for chunk in _iter_chunks(raw_data):
+        lines = zip(_iter_lines(chunk), _iter_lines(_preprocess_data(chunk, delimiter)))
+        for line, processed_line in lines:
+            if not line.strip():
+                # Empty lines only count once a data line follows them, and leading ones not at
+                # all, so surrounding blank lines are ignored as if the whole input were stripped.
+                if i:
+                    pending_empty_lines += 1
+                continue
+
+            for _ in range(pending_empty_lines):
+                i += 1
+                _logger.error(f"Line {i}: Skipping empty line.")
+                discarded_rows += 1
+            pending_empty_lines = 0
+            i += 1
+
+            original_line = line
+            fields = _split_line(processed_line, delimiter)
+            if not fields or not fields[0]:
+                _logger.error(
+                    f"Line {i}: DISCARDED - Line is empty after processing. Original: '{original_line}'")
+                discarded_rows += 1
+                continue
+
+            # 1. Process ID
+            entity_id = _process_id(fields[0], seen_ids, i, original_line)
+            if entity_id is None:
+                discarded_rows += 1
+                continue
+
+            # 2. Process Datetime
+            latest_dt_obj = _parse_and_clean_datetime(original_line, i)
+            if not latest_dt_obj:
+                _logger.error(
+                    f"Line {i}: DISCARDED - No valid datetime could be processed. Original: '{original_line}'")
+                discarded_rows += 1
+                continue
+            latest_datetime_str = latest_dt_obj.isoformat(' ', 'seconds')
+
+            # 3. Extract Status
+            status = _extract_status(fields)
+
+            # 4. Find the key field (device code or content device ID)
+            if unique_keys:
+                key_info = find_key(fields, seen_keys, i, original_line)
+            else:
+                key_info = find_key(fields, i, original_line)
+            if not key_info:
+                discarded_rows += 1
+                continue
+            key, key_index = key_info
+
+            # 5. Extract Name and Description
+            name, description = _extract_name_and_description(fields, key_index, entity_id)
+
+            # 6. Validate field lengths and assemble the clean data dictionary
+            final_row = build_row(entity_id, name, description, key, latest_datetime_str, status, i)
+
+            seen_ids.add(entity_id)
+            if unique_keys:
+                seen_keys.add(key)
+            success_rows += 1
+            _logger.info("Line %d: Successfully cleaned %s row. Result: %s", i, entity, final_row)
+            yield final_row
 
-    lines = raw_data.strip().split('\n')
-    total_rows = len(lines)
-    _logger.info(f"Starting cleaning process for {total_rows} raw device lines.")
-
-    for i, line in enumerate(lines, 1):
-        if not line.strip():
-            _logger.error(f"Line {i}: Skipping empty line.")
-            discarded_rows += 1
-            continue
-
-        original_line = line
-        fields = _preprocess_and_split_line(original_line, delimiter)
-        if not fields or not fields[0]:
-            _logger.error(
-                f"Line {i}: DISCARDED - Line is empty after processing. Original: '{original_line}'")
-            discarded_rows += 1
-            continue
-
-        # 1. Process ID
-        device_id = _process_id(fields[0], seen_ids, i, original_line)
-        if device_id is None:
-            discarded_rows += 1
-            continue
-
-        # 2. Process Datetime
-        latest_dt_obj = _parse_and_clean_datetime(original_line, i)
-        if not latest_dt_obj:
-            _logger.error(
-                f"Line {i}: DISCARDED - No valid datetime could be processed. Original: '{original_line}'")
-            discarded_rows += 1
-            continue
-        latest_datetime_str = latest_dt_obj.strftime('%Y-%m-%d %H:%M:%S')
-
-        # 3. Extract Status
-        status = _extract_status(fields)
-
-        # 4. Find Device Code
-        code_info = _find_device_code(fields, seen_codes, i, original_line)
-        if not code_info:
-            discarded_rows += 1
-            continue
-        device_code, code_index = code_info
-
-        # 5. Extract Name and Description
-        device_name, device_description = _extract_name_and_description(fields, code_index, device_id)
-
-        # 6. Validate Field Lengths
-        device_name = _truncate_field(device_name, 32, "Name", i)
-        device_description = _truncate_field(device_description, 128, "Description", i)
-
-        # 7. Final Assembly
-        final_row = {
-            'id': device_id,
-            'name': device_name,
-            'description': device_description,
-            'code': device_code,
-            'expire_date': latest_datetime_str,
-            'state': status
-        }
-
-        cleaned_rows.append(final_row)
-        seen_ids.add(device_id)
-        seen_codes.add(device_code)
-        _logger.info(f"Line {i}: Successfully cleaned device row. Result: {final_row}")
-
-    success_rows = len(cleaned_rows)
     _logger.info(
-        f"Device cleaning finished. Total rows: {total_rows}, "
+        f"{entity.capitalize()} cleaning finished. Total rows: {i}, "
         f"Successfully cleaned: {success_rows}, Discarded: {discarded_rows}."
     )
-    return cleaned_rows
 
-def clean_content_data(raw_data: str, delimiter: str) -> List[Dict[str, Any]]:
+# --- MAIN PUBLIC FUNCTIONS ---
+
+def clean_device_data(raw_data: Union[str, Iterable[str]], delimiter: str) -> Iterator[Dict[str, Any]]:
     """
-    Cleans and validates raw CSV data for content import.
+    Cleans and validates raw CSV data for device import with detailed logging.
+    The data may be a string or an iterable of lines such as an open file, which is then
+    cleaned in chunks. Cleaned rows are yielded one at a time.
     """
-    cleaned_rows = []
-    seen_ids = set()
-    discarded_rows = 0
+    return _clean_rows(raw_data, delimiter, 'device', _find_device_code, _build_device_row, unique_keys=True)
 
-    lines = raw_data.strip().split('\n')
-    total_rows = len(lines)
-    _logger.info(f"Starting content cleaning for {total_rows} raw lines.")
-
-    for i, line in enumerate(lines, 1):
-        if not line.strip():
-            discarded_rows += 1
-            continue
-
-        original_line = line
-        fields = _preprocess_and_split_line(original_line, delimiter)
-        if not fields or not fields[0]:
-            discarded_rows += 1
-            continue
-
-        # 1. Process Content ID
-        content_id = _process_id(fields[0], seen_ids, i, original_line)
-        if content_id is None:
-            discarded_rows += 1
-            continue
-
-        # 2. Process Datetime
-        latest_dt_obj = _parse_and_clean_datetime(original_line, i)
-        if not latest_dt_obj:
-            discarded_rows += 1
-            continue
-        latest_datetime_str = latest_dt_obj.strftime('%Y-%m-%d %H:%M:%S')
-
-        # 3. Extract Status
-        status = _extract_status(fields)
-
-        # 4. Find Device ID
-        device_id_info = _find_content_device_id(fields, i, original_line)
-        if not device_id_info:
-            discarded_rows += 1
-            continue
-        device_external_id, device_id_index = device_id_info
-
-        # 5. Extract Name and Description
-        name, desc = _extract_name_and_description(fields, device_id_index, content_id)
-
-        # 6. Truncate fields
-        content_name = _truncate_field(name, 100, "Content Name", i)
-        content_description = _truncate_field(desc, 128, "Content Description", i)
-
-        # 7. Assemble the clean data dictionary
-        final_row = {
-            'id': content_id,
-            'name': content_name,
-            'description': content_description,
-            'device_external_id': device_external_id,
-            'expire_date': latest_datetime_str,
-            'state': status
-        }
-
-        cleaned_rows.append(final_row)
-        seen_ids.add(content_id)
-        _logger.info(f"Line {i}: Successfully cleaned content row. Result: {final_row}")
-
-    _logger.info(
-        f"Content cleaning finished. Total: {total_rows}, Cleaned: {len(cleaned_rows)}, Discarded: {discarded_rows}."
-    )
-    return cleaned_rows
\ No newline at end of file
+def clean_content_data(raw_data: Union[str, Iterable[str]], delimiter: str) -> Iterator[Dict[str, Any]]:
+    """
+    Cleans and validates raw CSV data for content import.
+    The data may be a string or an iterable of lines such as an open file, which is then
+    cleaned in chunks. Cleaned rows are yielded one at a time.
+    """
+    return _clean_rows(raw_data, delimiter, 'content', _find_content_device_id, _build_content_row, unique_keys=False)